@@ -0,0 +1,245 @@
+import argparse
+import datetime
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import instrumentation
+import main as pipeline
+from benchmarks.synthetic_kg import generate_wikidata_dump, parse_size
+from evaluation import performance
+from knowledge_graph.kg_slicer import preprocess_wikidata
+from qa_dataset import qa_generator
+
+BASELINE_FILE = "benchmarks/baseline.json"
+DEFAULT_TOLERANCE = 1.0
+MISS_TOKEN = "zzqxjvbench"
+
+def metric(value, unit, higher_is_better=None):
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+def bench_slicer(dump_file, sliced_file, n_entities):
+    start = time.perf_counter()
+    preprocess_wikidata(input_bz2_file=dump_file, output_json_file=sliced_file)
+    seconds = time.perf_counter() - start
+    return {
+        "slicer_seconds": metric(seconds, "s", False),
+        "slicer_entities_per_second": metric(n_entities / seconds, "entities/s", True),
+        "slicer_compressed_mb_per_second": metric(os.path.getsize(dump_file) / 1e6 / seconds, "MB/s", True)
+    }
+
+def bench_kg_load(sliced_file):
+    start = time.perf_counter()
+    kg_data = pipeline.load_kg(sliced_file)
+    seconds = time.perf_counter() - start
+    del kg_data
+    gc.collect()
+    tracemalloc.start()
+    kg_data = pipeline.load_kg(sliced_file)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return kg_data, {
+        "kg_load_seconds": metric(seconds, "s", False),
+        "kg_load_peak_mb": metric(peak / 1e6, "MB", False),
+        "kg_entries": metric(len(kg_data), "entries")
+    }
+
+def bench_qa_generator(sliced_file, qa_file):
+    for category in qa_generator.categories_counters:
+        qa_generator.categories_counters[category] = 0
+    qa_generator.all_seen_questions.clear()
+    start = time.perf_counter()
+    qa_generator.main(input_file=sliced_file, output_file=qa_file)
+    seconds = time.perf_counter() - start
+    with open(qa_file, "r", encoding="utf-8") as f:
+        qa_dataset = json.load(f)["qa_dataset"]
+    return qa_dataset, {
+        "qa_generator_seconds": metric(seconds, "s", False),
+        "qa_entries": metric(len(qa_dataset), "entries")
+    }
+
+def time_filter_queries(kg_data, questions):
+    latencies = []
+    facts_per_question = {}
+    for question in questions:
+        start = time.perf_counter()
+        facts_per_question[question] = pipeline.filter_kg_facts(kg_data, question)
+        latencies.append(time.perf_counter() - start)
+    return facts_per_question, sorted(latencies)
+
+def full_scan_questions(kg_data, n_queries, rng):
+    tail = kg_data[-max(1, len(kg_data) // 100):]
+    rare = []
+    for item in rng.sample(tail, min(n_queries, len(tail))):
+        tokens = item.get("label_en", "").split()
+        if tokens:
+            rare.append(f"What is {tokens[-1]} ?")
+    miss = [f"What is {MISS_TOKEN}{i} ?" for i in range(n_queries)]
+    return rare, miss
+
+def bench_filter_kg_facts(kg_data, questions, n_queries, n_scan_queries, rng):
+    facts_per_question, latencies = time_filter_queries(kg_data, [rng.choice(questions) for _ in range(n_queries)])
+    rare, miss = full_scan_questions(kg_data, n_scan_queries, rng)
+    results = {
+        "filter_kg_facts_p50_ms": metric(instrumentation.percentile(latencies, 0.5) * 1000, "ms", False),
+        "filter_kg_facts_p95_ms": metric(instrumentation.percentile(latencies, 0.95) * 1000, "ms", False)
+    }
+    for name, scan_questions in (("rare", rare), ("miss", miss)):
+        if not scan_questions:
+            continue
+        _, scan_latencies = time_filter_queries(kg_data, scan_questions)
+        results[f"filter_kg_facts_{name}_p50_ms"] = metric(
+            instrumentation.percentile(scan_latencies, 0.5) * 1000, "ms", False
+        )
+        results[f"filter_kg_facts_{name}_p95_ms"] = metric(
+            instrumentation.percentile(scan_latencies, 0.95) * 1000, "ms", False
+        )
+    return facts_per_question, results
+
+def synthetic_results(qa_dataset, facts_per_question, n_entries, rng):
+    fact_lists = list(facts_per_question.values()) or [[]]
+    entries = []
+    for i in range(n_entries):
+        item = qa_dataset[i % len(qa_dataset)]
+        answers = [
+            f"The answer is {item['answer']}",
+            f"I am not sure, but it might be {rng.choice(qa_dataset)['answer']}",
+            "I do not have enough information to answer this question."
+        ]
+        entries.append({
+            "question": item["question"],
+            "reference_knowledge_snippet": item["knowledge_snippet"],
+            "reference_answer": item["answer"],
+            "llm_answer_only": rng.choice(answers),
+            "llm_answer_with_kg": rng.choice(answers),
+            "used_facts": fact_lists[i % len(fact_lists)]
+        })
+    return entries
+
+def bench_performance(entries):
+    start = time.perf_counter()
+    metrics = performance.compute_metric_arrays(entries)
+    performance.summarize_metrics(metrics)
+    scoring_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    performance.compare_conditions(metrics)
+    significance_seconds = time.perf_counter() - start
+    return {
+        "performance_entries_per_second": metric(len(entries) / scoring_seconds, "entries/s", True),
+        "significance_seconds": metric(significance_seconds, "s", False)
+    }
+
+def run_benchmarks(size, work_dir, n_queries=50, n_score_entries=100_000, seed=0, n_scan_queries=10):
+    n_entities = parse_size(size)
+    rng = random.Random(seed)
+    dump_file = os.path.join(work_dir, f"synthetic_{n_entities}_{seed}.json.bz2")
+    sliced_file = os.path.join(work_dir, f"kg_sliced_{n_entities}_{seed}.json")
+    qa_file = os.path.join(work_dir, f"qa_data_{n_entities}_{seed}.json")
+    results = {}
+    if not os.path.exists(dump_file):
+        start = time.perf_counter()
+        generate_wikidata_dump(dump_file, n_entities, seed)
+        results["generate_dump_seconds"] = metric(time.perf_counter() - start, "s")
+    results.update(bench_slicer(dump_file, sliced_file, n_entities))
+    kg_data, load_results = bench_kg_load(sliced_file)
+    results.update(load_results)
+    qa_dataset, qa_results = bench_qa_generator(sliced_file, qa_file)
+    results.update(qa_results)
+    questions = [item["question"] for item in qa_dataset] or [f"What is {item['label_en']}?" for item in kg_data[:100]]
+    facts_per_question, filter_results = bench_filter_kg_facts(kg_data, questions, n_queries, n_scan_queries, rng)
+    results.update(filter_results)
+    if qa_dataset:
+        results.update(bench_performance(synthetic_results(qa_dataset, facts_per_question, n_score_entries, rng)))
+    return results
+
+def compare_to_baseline(results, baseline):
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get("metrics", {}).get(name)
+        if not reference or reference.get("threshold") is None:
+            continue
+        if current["higher_is_better"]:
+            failed = current["value"] < reference["threshold"]
+        else:
+            failed = current["value"] > reference["threshold"]
+        if failed:
+            regressions.append(name)
+    return regressions
+
+def with_thresholds(results, tolerance):
+    metrics = {}
+    for name, current in results.items():
+        if current["higher_is_better"] is None:
+            metrics[name] = {**current, "threshold": None}
+            continue
+        factor = 1 / (1 + tolerance) if current["higher_is_better"] else 1 + tolerance
+        metrics[name] = {**current, "threshold": current["value"] * factor}
+    return metrics
+
+def format_results(results, baseline, regressions):
+    lines = [f"{'metric':<36}{'value':>14}{'baseline':>14}{'threshold':>14}  unit"]
+    for name, current in results.items():
+        reference = baseline.get("metrics", {}).get(name, {})
+        base = f"{reference['value']:.3f}" if "value" in reference else "-"
+        threshold = f"{reference['threshold']:.3f}" if reference.get("threshold") is not None else "-"
+        flag = "  REGRESSION" if name in regressions else ""
+        lines.append(f"{name:<36}{current['value']:>14.3f}{base:>14}{threshold:>14}  {current['unit']}{flag}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks on a synthetic Wikidata-shaped dump.")
+    parser.add_argument("--size", default="10k", help="10k, 1m, 10m or an entity count")
+    parser.add_argument("--work-dir", default=None, help="keep generated files here and reuse existing dumps")
+    parser.add_argument("--queries", type=int, default=50, help="number of filter_kg_facts queries")
+    parser.add_argument("--scan-queries", type=int, default=10,
+                        help="number of rare-token and of miss queries that scan the whole KG")
+    parser.add_argument("--score-entries", type=int, default=100_000, help="number of answers scored by performance.py")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the baseline for --size")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="thresholds allow a (1 + tolerance)x slowdown when updating the baseline")
+    parser.add_argument("--output", default=None, help="write this run's results to a JSON file")
+    args = parser.parse_args()
+    instrumentation.set_enabled(False)
+    size_key = str(args.size).lower()
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+        results = run_benchmarks(size_key, args.work_dir, args.queries, args.score_entries, args.seed,
+                                 args.scan_queries)
+    else:
+        with tempfile.TemporaryDirectory() as work_dir:
+            results = run_benchmarks(size_key, work_dir, args.queries, args.score_entries, args.seed,
+                                     args.scan_queries)
+    try:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baselines = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        baselines = {}
+    baseline = baselines.get(size_key, {})
+    regressions = compare_to_baseline(results, baseline)
+    print(format_results(results, baseline, regressions))
+    run = {
+        "size": size_key,
+        "n_entities": parse_size(size_key),
+        "recorded_at": datetime.datetime.now().isoformat(),
+        "metrics": results
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({**run, "regressions": regressions}, f, indent=2, ensure_ascii=False)
+    if args.update_baseline:
+        baselines[size_key] = {**run, "tolerance": args.tolerance, "metrics": with_thresholds(results, args.tolerance)}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, ensure_ascii=False)
+        print(f"Baseline for '{size_key}' written to '{args.baseline}'.")
+    elif regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
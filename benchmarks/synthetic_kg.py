@@ -0,0 +1,157 @@
+import bz2
+import json
+import random
+
+SIZES = {
+    "10k": 10_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000
+}
+GENDER_QIDS = ["Q6581097", "Q6581072"]
+FIRST_NAMES = ["George", "Ada", "Marie", "Alan", "Grace", "Isaac", "Emmy", "Niels", "Rosalind", "Carl", "Lise", "Max"]
+LAST_NAMES = ["Washington", "Lovelace", "Curie", "Turing", "Hopper", "Newton", "Noether", "Bohr", "Franklin", "Gauss"]
+WORDS = ["river", "north", "saint", "grand", "new", "old", "upper", "lower", "royal", "east", "west", "lake"]
+OCCUPATIONS = ["physicist", "writer", "painter", "politician", "mathematician", "composer", "actor", "chemist"]
+
+def parse_size(size):
+    size = str(size).lower()
+    if size in SIZES:
+        return SIZES[size]
+    return int(size)
+
+def entity_id(index):
+    return f"Q{1000 + index}"
+
+def item_snak(prop_id, qid):
+    return {
+        "mainsnak": {
+            "snaktype": "value",
+            "property": prop_id,
+            "datavalue": {"value": {"entity-type": "item", "numeric-id": int(qid[1:]), "id": qid}, "type": "wikibase-entityid"}
+        },
+        "type": "statement",
+        "rank": "normal"
+    }
+
+def time_snak(prop_id, year, month, day):
+    return {
+        "mainsnak": {
+            "snaktype": "value",
+            "property": prop_id,
+            "datavalue": {
+                "value": {"time": f"+{year:04d}-{month:02d}-{day:02d}T00:00:00Z", "timezone": 0, "precision": 11},
+                "type": "time"
+            }
+        },
+        "type": "statement",
+        "rank": "normal"
+    }
+
+def string_snak(prop_id, value):
+    return {
+        "mainsnak": {"snaktype": "value", "property": prop_id, "datavalue": {"value": value, "type": "string"}},
+        "type": "statement",
+        "rank": "normal"
+    }
+
+def entity_kind(index):
+    bucket = index % 20
+    if bucket < 11:
+        return "human"
+    if bucket == 11:
+        return "country"
+    if bucket < 14:
+        return "organization"
+    if bucket < 16:
+        return "city"
+    if bucket == 16:
+        return "occupation"
+    if bucket == 17:
+        return "ethnic_group"
+    if bucket == 18:
+        return "religion"
+    return "work"
+
+def random_of_kind(rng, n_entities, kind):
+    while True:
+        index = rng.randrange(n_entities)
+        if entity_kind(index) == kind:
+            return entity_id(index)
+
+def build_entity(index, n_entities, rng):
+    kind = entity_kind(index)
+    claims = {}
+    if kind == "human":
+        label = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {index}"
+        description = f"{rng.choice(OCCUPATIONS)} born in the {rng.randint(15, 20)}th century"
+        claims["P31"] = [item_snak("P31", "Q5")]
+        claims["P21"] = [item_snak("P21", rng.choice(GENDER_QIDS))]
+        claims["P19"] = [item_snak("P19", random_of_kind(rng, n_entities, "city"))]
+        claims["P569"] = [time_snak("P569", rng.randint(1600, 2000), rng.randint(1, 12), rng.randint(1, 28))]
+        claims["P27"] = [item_snak("P27", random_of_kind(rng, n_entities, "country"))]
+        claims["P106"] = [item_snak("P106", random_of_kind(rng, n_entities, "occupation")) for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.3:
+            claims["P172"] = [item_snak("P172", random_of_kind(rng, n_entities, "ethnic_group"))]
+        if rng.random() < 0.3:
+            claims["P140"] = [item_snak("P140", random_of_kind(rng, n_entities, "religion"))]
+    elif kind == "country":
+        label = f"{rng.choice(WORDS).capitalize()} Republic {index}"
+        description = "sovereign state"
+        claims["P31"] = [item_snak("P31", "Q6256")]
+    elif kind == "organization":
+        label = f"{rng.choice(WORDS).capitalize()} Society {index}"
+        description = "organization"
+        claims["P31"] = [item_snak("P31", "Q43229")]
+        claims["P17"] = [item_snak("P17", random_of_kind(rng, n_entities, "country"))]
+        claims["P131"] = [item_snak("P131", random_of_kind(rng, n_entities, "city"))]
+    elif kind == "city":
+        label = f"{rng.choice(WORDS).capitalize()}ton {index}"
+        description = "city"
+        claims["P31"] = [item_snak("P31", "Q515")]
+        claims["P279"] = [item_snak("P279", "Q43229")] if rng.random() < 0.5 else []
+        claims["P17"] = [item_snak("P17", random_of_kind(rng, n_entities, "country"))]
+    elif kind == "occupation":
+        label = f"{rng.choice(OCCUPATIONS)} {index}"
+        description = "occupation"
+        claims["P31"] = [item_snak("P31", "Q12737077")]
+        claims["P279"] = [item_snak("P279", "Q43229")] if rng.random() < 0.1 else []
+    elif kind == "ethnic_group":
+        label = f"{rng.choice(WORDS).capitalize()} people {index}"
+        description = "ethnic group"
+        claims["P31"] = [item_snak("P31", "Q41710")]
+        claims["P279"] = [item_snak("P279", "Q43229")] if rng.random() < 0.5 else []
+    elif kind == "religion":
+        label = f"{rng.choice(WORDS).capitalize()} faith {index}"
+        description = "religion"
+        claims["P31"] = [item_snak("P31", "Q9174")]
+        claims["P279"] = [item_snak("P279", "Q43229")] if rng.random() < 0.5 else []
+    else:
+        label = f"The {rng.choice(WORDS).capitalize()} Book {index}"
+        description = "literary work"
+        claims["P31"] = [item_snak("P31", "Q7725634"), item_snak("P31", "Q43229")]
+        claims["P50"] = [item_snak("P50", random_of_kind(rng, n_entities, "human"))]
+        claims["P123"] = [item_snak("P123", random_of_kind(rng, n_entities, "organization"))]
+    claims = {prop_id: statements for prop_id, statements in claims.items() if statements}
+    claims["P18"] = [string_snak("P18", f"Image {index}.jpg")]
+    entity = {
+        "type": "item",
+        "id": entity_id(index),
+        "labels": {"de": {"language": "de", "value": label}},
+        "descriptions": {"en": {"language": "en", "value": description}},
+        "claims": claims
+    }
+    if rng.random() < 0.98:
+        entity["labels"]["en"] = {"language": "en", "value": label}
+    return entity
+
+def generate_wikidata_dump(output_bz2_file, n_entities, seed=0):
+    if n_entities < 20:
+        raise ValueError("n_entities must be at least 20 to cover every entity kind")
+    rng = random.Random(seed)
+    with bz2.open(output_bz2_file, "wt", encoding="utf-8") as fout:
+        fout.write("[\n")
+        for index in range(n_entities):
+            line = json.dumps(build_entity(index, n_entities, rng), ensure_ascii=False)
+            fout.write(line + (",\n" if index < n_entities - 1 else "\n"))
+        fout.write("]\n")
+    return output_bz2_file
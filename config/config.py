@@ -2,4 +2,11 @@ AZURE_OPENAI_ENDPOINT = "xxx"
 API_KEY = "xxx"
 MAX_TOKENS = 500
 TEMPERATURE = 0.3
-MAX_RELEVANT_FACTS = 20
\ No newline at end of file
+MAX_RELEVANT_FACTS = 20
+MAX_PARALLEL_REQUESTS = 4
+# A full explainability run over the 429 examples needs about 21,000 calls (the old nsamples=50 run: about 25,700).
+LLM_CALL_BUDGET = 25000
+# One antithetic permutation pair costs 2n calls, so with MAX_RELEVANT_FACTS = 20 only one pair fits and the
+# reported standard error is a conservative one-pair estimate; exact values are computed for up to 5 triples.
+SHAPLEY_CALLS_PER_EXAMPLE = 50
+INSTRUMENTATION_ENABLED = True
\ No newline at end of file
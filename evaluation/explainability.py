@@ -1,12 +1,16 @@
 import os
 import json
+import math
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 from rapidfuzz import fuzz
 from lime.lime_text import LimeTextExplainer
-import shap
 import numpy as np
-from config.config import AZURE_OPENAI_ENDPOINT, API_KEY, MAX_TOKENS, TEMPERATURE
+from config.config import AZURE_OPENAI_ENDPOINT, API_KEY, MAX_TOKENS, TEMPERATURE, MAX_PARALLEL_REQUESTS, LLM_CALL_BUDGET, \
+    SHAPLEY_CALLS_PER_EXAMPLE
+import instrumentation
 
 def load_qa_data(json_file):
     with open(json_file, 'r', encoding='utf-8') as f:
@@ -18,7 +22,7 @@ def fuzzy_match_score(system_answer, reference_answer):
     score = fuzz.partial_ratio(system_answer.lower(), reference_answer.lower()) / 100.0
     return score
 
-def call_llm(prompt, model_name="gpt-3.5-turbo"):
+def call_llm(prompt, model_name="gpt-3.5-turbo", max_retries=3, wait_seconds=60):
     headers = {
         "Content-Type": "application/json",
         "api-key": API_KEY
@@ -31,67 +35,212 @@ def call_llm(prompt, model_name="gpt-3.5-turbo"):
         "temperature": TEMPERATURE,
         "model": model_name
     }
-    try:
-        response = requests.post(AZURE_OPENAI_ENDPOINT, json=payload, headers=headers)
-        if response.status_code == 200:
+    for attempt in range(max_retries):
+        if attempt > 0:
+            instrumentation.increment("llm_retries")
+        try:
+            with instrumentation.timed("llm_request"):
+                response = requests.post(AZURE_OPENAI_ENDPOINT, json=payload, headers=headers)
+        except requests.RequestException:
+            instrumentation.increment("llm_errors")
+            with instrumentation.timed("retry_sleep"):
+                time.sleep(wait_seconds)
+            continue
+        instrumentation.increment("llm_requests")
+        if response.status_code == 429:
+            instrumentation.increment("llm_rate_limited")
+            print(f"Rate Limit (429) erreicht, warte {wait_seconds} Sekunden... (Versuch {attempt+1}/{max_retries})")
+            with instrumentation.timed("rate_limit_sleep"):
+                time.sleep(wait_seconds)
+            continue
+        if response.status_code != 200:
+            instrumentation.increment("llm_errors")
+            return None
+        try:
             resp_json = response.json()
-            try:
-                answer = resp_json["choices"][0]["message"]["content"]
-                return answer.strip()
-            except (KeyError, IndexError):
-                return f"Unexpected response format: {resp_json}"
-        else:
-            return f"Error {response.status_code}: {response.text}"
-    except Exception as e:
-        return ""
-
-def predict_probability_of_correctness(prompts, reference_answer):
-    results = []
-    for p in prompts:
-        llm_ans = call_llm(p)
-        score = fuzzy_match_score(llm_ans, reference_answer)
-        p_correct = score
-        p_incorrect = 1.0 - score
-        results.append([p_incorrect, p_correct])
-    return np.array(results)
-
-def run_lime_explanation(question, knowledge_triples, reference_answer, num_samples=10):
-    full_prompt = question + "\n" + "\n".join(knowledge_triples)
+            instrumentation.record_usage(resp_json.get("usage"))
+            return resp_json["choices"][0]["message"]["content"].strip()
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+            instrumentation.increment("llm_errors")
+            return None
+    return None
+
+def build_prompt(question, triples):
+    return question + "\n" + "\n".join(triples)
+
+def score_prompts(prompts, reference_answer, score_cache=None, max_workers=MAX_PARALLEL_REQUESTS, budget=None):
+    if score_cache is None:
+        score_cache = {}
+    pending = [p for p in dict.fromkeys(prompts) if p not in score_cache]
+    instrumentation.increment("prompt_cache_hits", len(prompts) - len(pending))
+    if pending:
+        if budget is not None:
+            budget["remaining"] -= len(pending)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            answers = list(executor.map(call_llm, pending))
+        for p, llm_ans in zip(pending, answers):
+            if llm_ans is None:
+                instrumentation.increment("llm_failed_prompts")
+                continue
+            score_cache[p] = fuzzy_match_score(llm_ans, reference_answer)
+    return np.array([score_cache.get(p, np.nan) for p in prompts], dtype=float)
+
+def predict_probability_of_correctness(prompts, reference_answer, score_cache=None, budget=None):
+    scores = score_prompts(list(prompts), reference_answer, score_cache, budget=budget)
+    return np.column_stack([1.0 - scores, scores])
+
+@instrumentation.timed_function("lime_explanation")
+def run_lime_explanation(question, knowledge_triples, reference_answer, num_samples=10, score_cache=None,
+                         budget=None):
+    if budget is not None and budget["remaining"] < num_samples:
+        return "skipped_budget", None
+    full_prompt = build_prompt(question, knowledge_triples)
     explainer = LimeTextExplainer(class_names=["incorrect", "correct"])
+    failed = []
     def predict_func(text_samples):
-        return predict_probability_of_correctness(text_samples, reference_answer)
+        probabilities = predict_probability_of_correctness(text_samples, reference_answer, score_cache, budget)
+        failed.extend(np.flatnonzero(np.isnan(probabilities[:, 1])))
+        return np.nan_to_num(probabilities)
     exp = explainer.explain_instance(
         text_instance=full_prompt,
         classifier_fn=predict_func,
         labels=[1],
         num_samples=num_samples
     )
+    if failed:
+        return "failed", None
     local_explanation = exp.as_list(label=1)
-    return local_explanation
+    return "lime", local_explanation
 
-def shap_model_predict(x, question, reference_answer, all_triples):
-    results = []
-    for row in x:
-        included_triples = [all_triples[idx] for idx, val in enumerate(row) if val == 1]
-        prompt = question + "\n" + "\n".join(included_triples)
-        llm_ans = call_llm(prompt)
-        score = fuzzy_match_score(llm_ans, reference_answer)
-        results.append(score)
-    return np.array(results)
-
-def run_shap_explanation(question, knowledge_triples, reference_answer, nsamples=50):
-    x0 = np.ones((1, len(knowledge_triples)), dtype=int)
-    def predict_fn(x):
-        return shap_model_predict(x, question, reference_answer, knowledge_triples)
-    explainer = shap.KernelExplainer(model=predict_fn, data=x0)
-    shap_values = explainer.shap_values(x0, nsamples=nsamples)
-    sv = shap_values[0]
+def coalition_prompts(x, question, all_triples):
+    return [
+        build_prompt(question, [all_triples[idx] for idx, val in enumerate(row) if val == 1])
+        for row in x
+    ]
+
+def shap_model_predict(x, question, reference_answer, all_triples, score_cache=None, budget=None):
+    prompts = coalition_prompts(x, question, all_triples)
+    return score_prompts(prompts, reference_answer, score_cache, budget=budget)
+
+def count_new_prompts(x, question, all_triples, score_cache):
+    return len(set(coalition_prompts(x, question, all_triples)) - score_cache.keys())
+
+def exact_shapley_values(question, knowledge_triples, reference_answer, score_cache, budget=None):
+    n = len(knowledge_triples)
+    masks = np.arange(1 << n)
+    x = (masks[:, None] >> np.arange(n)) & 1
+    values = shap_model_predict(x, question, reference_answer, knowledge_triples, score_cache, budget)
+    if np.isnan(values).any():
+        return None
+    sizes = x.sum(axis=1)
+    weights = np.array([math.factorial(s) * math.factorial(n - s - 1) for s in range(n)]) / math.factorial(n)
+    phi = np.empty(n)
+    for i in range(n):
+        without_i = masks[x[:, i] == 0]
+        phi[i] = np.sum(weights[sizes[without_i]] * (values[without_i | (1 << i)] - values[without_i]))
+    return phi
+
+def antithetic_permutation_coalitions(n, n_pairs, rng):
+    permutations = np.array([rng.permutation(n) for _ in range(n_pairs)]).reshape(n_pairs, n)
+    permutations = np.concatenate([permutations, permutations[:, ::-1]])
+    x = np.zeros((len(permutations), n + 1, n), dtype=int)
+    for k in range(n):
+        x[:, k + 1] = x[:, k]
+        x[np.arange(len(permutations)), k + 1, permutations[:, k]] = 1
+    return permutations, x
+
+def round_call_limit(n, pairs_per_round):
+    return 2 * n * pairs_per_round
+
+def sampled_shapley_values(question, knowledge_triples, reference_answer, max_calls, score_cache, budget=None,
+                           pairs_per_round=4, tolerance=0.02, rng=None):
+    rng = np.random.default_rng(rng)
+    n = len(knowledge_triples)
+    calls_used = 0
+    pairs = []
+    converged = False
+    while True:
+        n_pairs = pairs_per_round
+        while n_pairs > 0:
+            permutations, x = antithetic_permutation_coalitions(n, n_pairs, rng)
+            new_calls = count_new_prompts(x.reshape(-1, n), question, knowledge_triples, score_cache)
+            if calls_used + new_calls <= max_calls:
+                break
+            n_pairs -= 1
+        if n_pairs == 0:
+            break
+        values = shap_model_predict(
+            x.reshape(-1, n), question, reference_answer, knowledge_triples, score_cache, budget
+        ).reshape(len(permutations), n + 1)
+        calls_used += new_calls
+        marginal = np.empty((len(permutations), n))
+        marginal[np.arange(len(permutations))[:, None], permutations] = np.diff(values, axis=1)
+        round_pairs = np.stack([marginal[:n_pairs], marginal[n_pairs:]], axis=1)
+        complete = ~np.isnan(round_pairs).any(axis=(1, 2))
+        instrumentation.increment("shapley_failed_pairs", int(np.count_nonzero(~complete)))
+        pairs.extend(round_pairs[complete])
+        if len(pairs) >= 2:
+            samples = np.mean(pairs, axis=1)
+            std_errors = np.std(samples, axis=0, ddof=1) / math.sqrt(len(samples))
+            if std_errors.max() <= tolerance:
+                converged = True
+                break
+    if not pairs:
+        return None, None, False
+    samples = np.mean(pairs, axis=1)
+    if len(samples) == 1:
+        # One antithetic pair: its two permutations are negatively correlated, so their spread overestimates the SE.
+        std_errors = np.std(pairs[0], axis=0, ddof=1) / math.sqrt(2)
+        return samples[0], std_errors, bool(std_errors.max() <= tolerance)
+    return samples.mean(axis=0), np.std(samples, axis=0, ddof=1) / math.sqrt(len(samples)), converged
+
+def estimate_shapley_values(question, knowledge_triples, reference_answer, max_calls=None, score_cache=None,
+                            budget=None, pairs_per_round=4, tolerance=0.02, rng=None):
+    if score_cache is None:
+        score_cache = {}
+    n = len(knowledge_triples)
+    if n == 0:
+        return "exact", np.zeros(0), np.zeros(0), True
+    if max_calls is None:
+        max_calls = SHAPLEY_CALLS_PER_EXAMPLE
+    if budget is not None:
+        max_calls = min(max_calls, budget["remaining"])
+    if (1 << n) <= max_calls:
+        phi = exact_shapley_values(question, knowledge_triples, reference_answer, score_cache, budget)
+        if phi is None:
+            return "failed", None, None, False
+        return "exact", phi, np.zeros(n), True
+    if max_calls < round_call_limit(n, 1):
+        return "skipped_budget", None, None, False
+    pairs_per_round = min(pairs_per_round, max_calls // round_call_limit(n, 1))
+    phi, std_errors, converged = sampled_shapley_values(
+        question, knowledge_triples, reference_answer, max_calls, score_cache, budget,
+        pairs_per_round=pairs_per_round, tolerance=tolerance, rng=rng
+    )
+    if phi is None:
+        return "failed", None, None, False
+    return "antithetic_permutation", phi, std_errors, converged
+
+@instrumentation.timed_function("shapley_explanation")
+def run_shap_explanation(question, knowledge_triples, reference_answer, nsamples=None, score_cache=None, budget=None,
+                         rng=None):
+    method, phi, std_errors, converged = estimate_shapley_values(
+        question, knowledge_triples, reference_answer, max_calls=nsamples, score_cache=score_cache,
+        budget=budget, rng=rng
+    )
     results = []
     for i, triple in enumerate(knowledge_triples):
-        val = sv[i]
+        if phi is None:
+            results.append({
+                "triple": triple, "shap_value": None, "std_error": None, "method": method, "converged": False
+            })
+            continue
         results.append({
             "triple": triple,
-            "shap_value": float(val)
+            "shap_value": float(phi[i]),
+            "std_error": None if np.isnan(std_errors[i]) else float(std_errors[i]),
+            "method": method,
+            "converged": converged
         })
     return results
 
@@ -104,6 +253,9 @@ def main():
     if not data:
         return
     analysis_results = []
+    budget = None if LLM_CALL_BUDGET is None else {"remaining": LLM_CALL_BUDGET}
+    skipped = 0
+    failed = 0
     for idx, example in enumerate(data):
         question = example.get("question", "N/A")
         reference_answer = example.get("reference_answer", "")
@@ -112,17 +264,37 @@ def main():
             f"{fact.get('subject', '')} - {fact.get('relation', '')} - {fact.get('object', '')}"
             for fact in knowledge_facts
         ]
-        lime_exp = run_lime_explanation(question, triple_strings, reference_answer, num_samples=10)
-        shap_exp = run_shap_explanation(question, triple_strings, reference_answer, nsamples=50)
+        score_cache = {}
+        lime_method, lime_exp = run_lime_explanation(question, triple_strings, reference_answer, num_samples=10,
+                                                     score_cache=score_cache, budget=budget)
+        shap_exp = run_shap_explanation(question, triple_strings, reference_answer,
+                                        score_cache=score_cache, budget=budget, rng=idx)
+        if lime_method == "failed" or any(item["method"] == "failed" for item in shap_exp):
+            failed += 1
+            instrumentation.increment("failed_examples")
+        if lime_method == "skipped_budget" or any(item["method"] == "skipped_budget" for item in shap_exp):
+            if skipped == 0:
+                print(f"Warnung: LLM_CALL_BUDGET ({LLM_CALL_BUDGET}) erschöpft ab Beispiel {idx}, "
+                      "weitere Erklärungen werden übersprungen.")
+            skipped += 1
+            instrumentation.increment("skipped_budget_examples")
         analysis_results.append({
             "index": idx,
             "question": question,
             "reference_answer": reference_answer,
-            "lime_explanation": lime_exp,
+            "lime_method": lime_method,
+            "lime_explanation": lime_exp or [],
             "shap_explanation": shap_exp
         })
     with open(output_path, "w", encoding="utf-8") as f:
         json.dump(analysis_results, f, indent=2, ensure_ascii=False)
+    if skipped:
+        print(f"Warnung: {skipped} von {len(analysis_results)} Beispielen wegen LLM_CALL_BUDGET übersprungen.")
+    if failed:
+        print(f"Warnung: {failed} von {len(analysis_results)} Beispielen mit fehlgeschlagenen LLM-Aufrufen "
+              "(Methode 'failed', keine Erklärung berechnet).")
+    instrumentation.increment("examples", len(analysis_results))
+    instrumentation.write_run_report("explainability")
 
 if __name__ == "__main__":
     main()
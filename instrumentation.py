@@ -0,0 +1,142 @@
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from config.config import INSTRUMENTATION_ENABLED
+
+REPORT_DIR = "results/run_reports"
+HISTOGRAM_BUCKETS = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0]
+
+_enabled = INSTRUMENTATION_ENABLED
+_lock = threading.Lock()
+_timings = defaultdict(list)
+_counters = Counter()
+_started_at = datetime.datetime.now()
+_disabled_timer = nullcontext()
+
+def set_enabled(flag):
+    global _enabled
+    _enabled = bool(flag)
+
+def is_enabled():
+    return _enabled
+
+def reset():
+    global _started_at
+    with _lock:
+        _timings.clear()
+        _counters.clear()
+        _started_at = datetime.datetime.now()
+
+def record_time(stage, seconds):
+    if not _enabled:
+        return
+    with _lock:
+        _timings[stage].append(seconds)
+
+def increment(counter, amount=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[counter] += amount
+
+def record_usage(usage, prefix="llm"):
+    if not _enabled or not isinstance(usage, dict):
+        return
+    with _lock:
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            if isinstance(usage.get(key), int):
+                _counters[f"{prefix}_{key}"] += usage[key]
+
+@contextmanager
+def _timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_time(stage, time.perf_counter() - start)
+
+def timed(stage):
+    if not _enabled:
+        return _disabled_timer
+    return _timer(stage)
+
+def timed_function(stage):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def _histogram(sorted_values):
+    histogram = {}
+    lower = 0
+    for bound in HISTOGRAM_BUCKETS:
+        upper = lower
+        while upper < len(sorted_values) and sorted_values[upper] <= bound:
+            upper += 1
+        histogram[f"<={bound}s"] = upper - lower
+        lower = upper
+    histogram[f">{HISTOGRAM_BUCKETS[-1]}s"] = len(sorted_values) - lower
+    return histogram
+
+def stage_summary(durations):
+    values = sorted(durations)
+    return {
+        "count": len(values),
+        "total": sum(values),
+        "mean": sum(values) / len(values),
+        "min": values[0],
+        "p50": percentile(values, 0.5),
+        "p95": percentile(values, 0.95),
+        "max": values[-1],
+        "histogram": _histogram(values)
+    }
+
+def build_report(name):
+    finished_at = datetime.datetime.now()
+    with _lock:
+        timings = {stage: list(durations) for stage, durations in _timings.items()}
+        counters = dict(_counters)
+    return {
+        "name": name,
+        "started_at": _started_at.isoformat(),
+        "finished_at": finished_at.isoformat(),
+        "wall_time": (finished_at - _started_at).total_seconds(),
+        "stages": {stage: stage_summary(durations) for stage, durations in timings.items() if durations},
+        "counters": counters
+    }
+
+def format_summary(report):
+    lines = [f"{'stage':<28}{'count':>8}{'total s':>12}{'mean ms':>12}{'p95 ms':>12}"]
+    for stage, s in sorted(report["stages"].items(), key=lambda item: -item[1]["total"]):
+        lines.append(f"{stage:<28}{s['count']:>8}{s['total']:>12.3f}{s['mean'] * 1000:>12.1f}{s['p95'] * 1000:>12.1f}")
+    for counter, value in sorted(report["counters"].items()):
+        lines.append(f"{counter:<28}{value:>8}")
+    lines.append(f"{'wall time':<28}{'':>8}{report['wall_time']:>12.3f}")
+    return "\n".join(lines)
+
+def write_run_report(name, report_dir=REPORT_DIR):
+    if not _enabled:
+        return None
+    report = build_report(name)
+    os.makedirs(report_dir, exist_ok=True)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    report_file = os.path.join(report_dir, f"{name}_{timestamp}.json")
+    with open(report_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(format_summary(report))
+    print(f"Run report: {report_file}")
+    return report_file
@@ -1,6 +1,8 @@
 import bz2
 import json
+import instrumentation
 
+@instrumentation.timed_function("preprocess_wikidata")
 def preprocess_wikidata(input_bz2_file="knowledge_graph/raw/latest-all.json.bz2", output_json_file="knowledge_graph/sliced/kg_sliced.json", max_items=None):
     target_ids = {"Q5", "Q43229", "Q6256"}
     properties_of_interest = {
@@ -8,10 +10,12 @@ def preprocess_wikidata(input_bz2_file="knowledge_graph/raw/latest-all.json.bz2"
         "P17","P131","P50","P123"
     }
     count_written = 0
+    count_read = 0
     with bz2.open(input_bz2_file, "rt", encoding="utf-8") as fin, open(output_json_file, "w", encoding="utf-8") as fout:
         fout.write("[\n")
         first_item = True
         for line in fin:
+            count_read += 1
             line = line.strip()
             if not line or line in ["[", "]", ","]:
                 continue
@@ -76,6 +80,8 @@ def preprocess_wikidata(input_bz2_file="knowledge_graph/raw/latest-all.json.bz2"
             if max_items and count_written >= max_items:
                 break
         fout.write("\n]\n")
+    instrumentation.increment("lines_read", count_read)
+    instrumentation.increment("items_written", count_written)
     print(f"Fertig. Insgesamt {count_written} Einträge nach '{output_json_file}' geschrieben.")
 
 if __name__ == "__main__":
@@ -84,3 +90,4 @@ if __name__ == "__main__":
         output_json_file="knowledge_graph/sliced/kg_sliced.json",
         max_items=None
     )
+    instrumentation.write_run_report("kg_slicer")
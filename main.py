@@ -3,16 +3,18 @@ import json
 import datetime
 import time
 from config.config import AZURE_OPENAI_ENDPOINT, API_KEY, MAX_TOKENS, TEMPERATURE, MAX_RELEVANT_FACTS
+import instrumentation
 
 KG_FILE = "knowledge_graph/sliced/kg_sliced.json"
 QA_DATASET_FILE = "qa_Dataset/qa_data.json"
 LOG_FILE = "results/results.json"
 
 def load_kg(filename):
-    with open(filename, "r", encoding="utf-8") as f:
+    with instrumentation.timed("kg_load"), open(filename, "r", encoding="utf-8") as f:
         data = json.load(f)
     return data
 
+@instrumentation.timed_function("filter_kg_facts")
 def filter_kg_facts(kg_data, question):
     stopwords = {"what", "is", "the", "of", "a", "an", "which", "in", "on", "and", "or", "?"}
     question_tokens = [w for w in question.lower().split() if w not in stopwords]
@@ -46,11 +48,19 @@ def build_system_prompt(facts):
 
 def call_azure_openai(payload, headers, max_retries=3, wait_seconds=60):
     for attempt in range(max_retries):
-        response = requests.post(AZURE_OPENAI_ENDPOINT, json=payload, headers=headers)
+        if attempt > 0:
+            instrumentation.increment("llm_retries")
+        with instrumentation.timed("llm_request"):
+            response = requests.post(AZURE_OPENAI_ENDPOINT, json=payload, headers=headers)
+        instrumentation.increment("llm_requests")
         if response.status_code == 429:
+            instrumentation.increment("llm_rate_limited")
             print(f"Rate Limit (429) erreicht, warte {wait_seconds} Sekunden... (Versuch {attempt+1}/{max_retries})")
-            time.sleep(wait_seconds)
+            with instrumentation.timed("rate_limit_sleep"):
+                time.sleep(wait_seconds)
         else:
+            if response.status_code != 200:
+                instrumentation.increment("llm_errors")
             return response
     return response
 
@@ -75,6 +85,7 @@ def ask_llm_only(question):
     response = call_azure_openai(payload, headers)
     if response.status_code == 200:
         resp_json = response.json()
+        instrumentation.record_usage(resp_json.get("usage"))
         try:
             return resp_json["choices"][0]["message"]["content"]
         except (KeyError, IndexError):
@@ -100,6 +111,7 @@ def ask_llm_with_kg(question, kg_data):
     response = call_azure_openai(payload, headers)
     if response.status_code == 200:
         resp_json = response.json()
+        instrumentation.record_usage(resp_json.get("usage"))
         try:
             llm_answer = resp_json["choices"][0]["message"]["content"]
             return llm_answer, relevant_facts
@@ -108,6 +120,7 @@ def ask_llm_with_kg(question, kg_data):
     else:
         return f"Error {response.status_code}: {response.text}", relevant_facts
 
+@instrumentation.timed_function("log_answers")
 def log_answers(item, llm_answer, kg_answer, used_facts, log_file=LOG_FILE):
     log_entry = {
         "timestamp": datetime.datetime.now().isoformat(),
@@ -139,9 +152,11 @@ if __name__ == "__main__":
     for i, item in enumerate(qa_dataset, start=1):
         question = item["question"]
         print(f"\n=== {i}/{len(qa_dataset)}: Frage: {question} ===")
-        llm_only_answer = ask_llm_only(question)
+        with instrumentation.timed("ask_llm_only"):
+            llm_only_answer = ask_llm_only(question)
         print(" - LLM-Only:", llm_only_answer)
-        llm_kg_answer, used_facts = ask_llm_with_kg(question, kg_data)
+        with instrumentation.timed("ask_llm_with_kg"):
+            llm_kg_answer, used_facts = ask_llm_with_kg(question, kg_data)
         if isinstance(used_facts, list):
             print(f" - LLM+KG: {llm_kg_answer} (Fakten: {len(used_facts)})")
         else:
@@ -149,3 +164,4 @@ if __name__ == "__main__":
         log_answers(item, llm_only_answer, llm_kg_answer, used_facts, LOG_FILE)
         print(f"Ergebnis in '{LOG_FILE}' protokolliert.")
     print("\nFertig! Alle Fragen wurden bearbeitet.")
+    instrumentation.write_run_report("main")
@@ -1,4 +1,5 @@
 import json
+import instrumentation
 
 MAX_PER_CATEGORY = 50
 gender_map = {
@@ -300,28 +301,32 @@ def build_qa_entries_for_item(item, all_labels):
                     categories_counters["multi_hop"] += 1
     return qa_entries
 
-def main():
-    input_file = "knowledge_graph/sliced/kg_sliced.json"
-    output_file = "qa_Dataset/qa_data.json"
-    with open(input_file, "r", encoding="utf-8") as f:
+def main(input_file="knowledge_graph/sliced/kg_sliced.json", output_file="qa_Dataset/qa_data.json"):
+    with instrumentation.timed("kg_load"), open(input_file, "r", encoding="utf-8") as f:
         data = json.load(f)
     all_labels = {}
     for item in data:
         qid = item["id"]
         all_labels[qid] = item["label_en"]
     qa_dataset = []
-    for item in data:
-        if is_all_categories_filled():
-            break
-        new_qas = build_qa_entries_for_item(item, all_labels)
-        qa_dataset.extend(new_qas)
-        if is_all_categories_filled():
-            break
-    with open(output_file, "w", encoding="utf-8") as f_out:
+    items_scanned = 0
+    with instrumentation.timed("qa_generation"):
+        for item in data:
+            if is_all_categories_filled():
+                break
+            items_scanned += 1
+            new_qas = build_qa_entries_for_item(item, all_labels)
+            qa_dataset.extend(new_qas)
+            if is_all_categories_filled():
+                break
+    with instrumentation.timed("write_qa_data"), open(output_file, "w", encoding="utf-8") as f_out:
         json.dump({"qa_dataset": qa_dataset}, f_out, ensure_ascii=False, indent=2)
+    instrumentation.increment("items_scanned", items_scanned)
+    instrumentation.increment("qa_entries", len(qa_dataset))
     print(f"Total Q&A: {len(qa_dataset)}")
     for cat, cnt in categories_counters.items():
         print(f"{cat}: {cnt}")
+    instrumentation.write_run_report("qa_generator")
 
 if __name__ == "__main__":
     main()